@@ -1,37 +1,173 @@
-# pip install moviepy speechrecognition pydub google-cloud-speech
+# pip install speechrecognition pydub google-cloud-speech numpy httpx[http2]
+# numba (optional, same pins as below) speeds up silence detection
+# ffmpeg has to be installed and on PATH
 #
-# spleeter splits voices from audio file
+# spleeter splits voices from audio file (--separate spleeter)
 # install spleeter (Tested mac os X with m1 cpu)
 #
 # pip install numba==0.56.2
 # pip install numpy==1.23.5
-# pip install llvmlite=0.39.1
+# pip install llvmlite==0.39.1
 # pip install tensorflow==2.15.1
 #
+# demucs splits voices from audio file on cuda/mps (--separate demucs)
+#
+# pip install demucs
+#
 # environment variables
 # for naver speech to text
 # - NAVER_CLIENT_ID - naver cloud client id
 # - NAVER_CLIENT_SECRET - naver cloud application client secret
 # for google cloud speech to text
 # - GOOGLE_APPLICATION_CREDENTIALS - application credential json file path
+# rate limits (requests per second, default 10)
+# - NAVER_QPS, GOOGLE_QPS
 # 
 
-import sys
-from moviepy.editor import VideoFileClip
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import heapq
+import io
+import itertools
+import platform
+import random
+import subprocess
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import speech_recognition as sr
 from pydub import AudioSegment
-from pydub.silence import split_on_silence
 import os
-import glob
-import requests
+import httpx
+
+try:
+    import numba
+except ImportError:
+    # numba is optional, silence detection falls back to plain NumPy
+    numba = None
+
+try:
+    import xxhash
+except ImportError:
+    # xxhash is optional, cache keys fall back to blake2b
+    xxhash = None
+
+try:
+    import liburing
+except ImportError:
+    # liburing is optional, chunk files are written with plain os.write without it
+    liburing = None
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket used to keep concurrent requests under a vendor's
+    requests-per-second quota.
+
+    :param rate: Tokens added per second.
+    :param capacity: Maximum number of tokens, i.e. the allowed burst size.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if not rate > 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Takes a token if one is available.
+
+        :return: 0 if a token was taken, otherwise seconds until one is available.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity,
+                              self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
 
-from spleeter.separator import Separator
+    def acquire(self):
+        """
+        Blocks until a token is available and takes it.
+        """
+        wait = self.reserve()
+        while wait > 0:
+            time.sleep(wait)
+            wait = self.reserve()
+
+    async def acquire_async(self):
+        """
+        Waits without blocking the event loop until a token is available and takes it.
+        """
+        wait = self.reserve()
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self.reserve()
+
+
+def qps_from_env(name, default=10):
+    rate = float(os.environ.get(name, default))
+    if not rate > 0:
+        raise ValueError(f"{name} must be a positive number of requests per second, "
+                         f"got {os.environ[name]!r}")
+    return rate
+
+
+NAVER_RATE_LIMITER = TokenBucket(qps_from_env('NAVER_QPS'))
+GOOGLE_RATE_LIMITER = TokenBucket(qps_from_env('GOOGLE_QPS'))
+
+NAVER_MAX_RETRIES = 5
+
+# Recognized text of every chunk is kept here, keyed by a hash of the chunk audio,
+# vendor and language, so reruns don't pay for the same request twice
+TRANSCRIPT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache",
+                                    "autogen-subtitles")
+
+# Vocal separation models are expensive to build, so they are loaded on first use
+# and kept for the rest of the process
+_spleeter_separator = None
+_demucs_model = None
+_whisper_model = None
+# Guards loading the whisper model and running it, whisper installs kv-cache hooks
+# on the model while decoding so it can't be used from several threads at once
+_whisper_lock = threading.Lock()
+
+# speech_recognition's Recognizer keeps per-source state (energy threshold set by
+# adjust_for_ambient_noise), so every worker thread gets its own instance.
+_thread_local = threading.local()
+
+
+def get_thread_recognizer():
+    recognizer = getattr(_thread_local, 'recognizer', None)
+    if recognizer is None:
+        recognizer = sr.Recognizer()
+        _thread_local.recognizer = recognizer
+    return recognizer
 
 
 def convert_video_to_audio(video_path, audio_path="temp_audio.wav"):
-    video = VideoFileClip(video_path)
-    video.audio.write_audiofile(audio_path)
-    video.close()  # It's a good practice to close the clip to free resources
+    """
+    Extracts the audio track of a video as 16kHz mono 16-bit PCM WAV with ffmpeg,
+    which is what speech-to-text apis expect.
+
+    :param video_path: Path to the input video file.
+    :param audio_path: Path of the WAV file to write.
+    :return: audio_path
+    """
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                    "-i", video_path, "-vn", "-acodec", "pcm_s16le",
+                    "-ar", "16000", "-ac", "1", audio_path], check=True)
     return audio_path
 
 
@@ -42,33 +178,269 @@ def add_padding_to_chunks(chunks, padding_duration_ms=5000):
     
     :param padding_duration_ms: Duration of the padding in milliseconds. Each chunk will
     be extended by this amount at the start with audio from the end of the previous chunk.
-    :param chunks: A list of AudioSegment objects.
+    :param chunks: An iterable of AudioSegment objects.
     :param padding_duration_ms: Duration
     of the padding in milliseconds. Each chunk will be extended by this amount at the
     start with audio from the end of the previous chunk.
-    :return: A list of padded AudioSegment objects.
+    :return: An iterator of padded AudioSegment objects.
     """
-    padded_chunks = []
-    for i, chunk in enumerate(chunks):
-        if i == 0:
-            padded_chunk = AudioSegment.silent(duration=padding_duration_ms) + chunk
+    previous = None
+    for chunk in chunks:
+        samples = audio_segment_samples(chunk)
+        pad_samples = padding_duration_ms * chunk.frame_rate // 1000 * chunk.channels
+        if previous is None:
+            overlap = np.zeros(pad_samples, dtype=samples.dtype)
         else:
-            previous_chunk = chunks[i - 1]
-            # Extract the last 'padding_duration_ms' milliseconds from the previous chunk
-            overlap = previous_chunk[-min(len(previous_chunk), padding_duration_ms):]
-            padded_chunk = overlap + chunk
+            # Take the last 'padding_duration_ms' milliseconds from the previous chunk
+            overlap = previous[max(0, len(previous) - pad_samples):]
+        yield chunk._spawn(np.concatenate((overlap, samples)).tobytes())
+        previous = samples
+
+
+SAMPLE_DTYPES = {1: np.int8, 2: np.int16, 4: np.int32}
+
+
+def audio_segment_samples(segment):
+    """
+    Returns the interleaved samples of an AudioSegment as a NumPy array view of its
+    raw PCM data (no copy).
+    """
+    return np.frombuffer(segment.raw_data, dtype=SAMPLE_DTYPES[segment.sample_width])
+
+
+def find_peak_amplitude(audio_path, window_ms=1000):
+    """
+    Largest absolute sample value of a WAV file, read in windows of `window_ms`.
+    """
+    with wave.open(audio_path, 'rb') as wav_file:
+        dtype = SAMPLE_DTYPES[wav_file.getsampwidth()]
+        window_len = wav_file.getframerate() * window_ms // 1000
+        peak = 0
+        while True:
+            data = wav_file.readframes(window_len)
+            if not data:
+                break
+            samples = np.frombuffer(data, dtype=dtype).astype(np.int64)
+            peak = max(peak, int(np.abs(samples).max()))
+    return peak
+
+
+def normalization_gain(audio_path, target_dbfs=-1.0):
+    """
+    Gain that brings the peak of a WAV file to `target_dbfs`.
+    """
+    with wave.open(audio_path, 'rb') as wav_file:
+        max_amplitude = 2 ** (8 * wav_file.getsampwidth() - 1)
+    peak = find_peak_amplitude(audio_path)
+    if peak == 0:
+        return 1.0
+    return 10 ** (target_dbfs / 20) * max_amplitude / peak
+
+
+def apply_gain(segment, gain):
+    if gain == 1.0:
+        return segment
+    samples = audio_segment_samples(segment)
+    info = np.iinfo(samples.dtype)
+    scaled = np.clip(samples.astype(np.float32) * gain, info.min, info.max)
+    return segment._spawn(scaled.astype(samples.dtype).tobytes())
+
+
+def to_speech_format(segment):
+    # Speech-to-text apis work on 16kHz mono, sending more only costs upload time.
+    # Separated vocals come out of spleeter/demucs at 44.1kHz stereo.
+    return segment.set_frame_rate(16000).set_channels(1).set_sample_width(2)
+
+
+def silence_mask_numpy(samples, frame_len, thresh):
+    """
+    Marks consecutive frames of `frame_len` samples whose RMS is at most `thresh`,
+    a trailing partial frame is dropped.
+    """
+    n_frames = len(samples) // frame_len
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+    return (frames.astype(np.float32) ** 2).mean(axis=1) <= np.float32(thresh) ** 2
 
-        padded_chunks.append(padded_chunk)
 
-    return padded_chunks
+if numba is not None:
+    # Compiled once and cached next to the script. The threshold is compared
+    # against the sum of squares directly, so the whole scan is one multiply-add
+    # loop llvm turns into SIMD, with no sqrt or intermediate RMS array. Not
+    # parallel: it runs on the splitting thread of the recognition pipeline, and
+    # numba's default threading layer hangs interpreter exit when launched from a
+    # thread other than the main one (a 1 second window is only 100 frames anyway).
+    @numba.njit(cache=True, fastmath=True)
+    def silence_mask(samples, frame_len, thresh):
+        n_frames = samples.shape[0] // frame_len
+        limit = thresh * thresh * frame_len
+        mask = np.empty(n_frames, dtype=np.bool_)
+        for frame in range(n_frames):
+            total = 0.0
+            for k in range(frame * frame_len, (frame + 1) * frame_len):
+                value = np.float64(samples[k])
+                total += value * value
+            mask[frame] = total <= limit
+        return mask
+else:
+    silence_mask = silence_mask_numpy
+
+
+def iter_nonsilent_ranges(audio_path, min_silence_len=1000, silence_thresh=-30,
+                          keep_silence=1000, frame_ms=10, window_ms=1000, gain=1.0):
+    """
+    Finds the non-silent parts of a WAV file with a frame based RMS threshold.
+    Silence is a run of at least `min_silence_len` in which every `frame_ms` frame
+    is below the threshold, unlike pydub's split_on_silence which compares the RMS
+    of a sliding `min_silence_len` window. Ranges are padded with `keep_silence`
+    the same way pydub does. The file is streamed in windows of `window_ms`, so
+    memory use doesn't grow with the length of the audio, and each range is
+    yielded as soon as the start of the next one is found.
+
+    :param audio_path: Path to the WAV file to analyze.
+    :param min_silence_len: Minimum length of silence in milliseconds to consider
+    as a split point.
+    :param silence_thresh: Silence threshold in dBFS.
+    :param keep_silence: Amount of silence in milliseconds to keep around each
+    non-silent range.
+    :param frame_ms: Length of the frames the RMS is computed over.
+    :param window_ms: Length of audio read at once.
+    :param gain: Gain the audio is normalized with, the threshold is applied to the
+    normalized level.
+    :return: An iterator of (start_ms, end_ms) tuples.
+    """
+    with wave.open(audio_path, 'rb') as wav_file:
+        channels = wav_file.getnchannels()
+        sample_width = wav_file.getsampwidth()
+        total_ms = wav_file.getnframes() * 1000 // wav_file.getframerate()
+        frame_len = wav_file.getframerate() * frame_ms // 1000
+        window_len = frame_len * max(1, window_ms // frame_ms)
+        # Scaling the threshold instead of the samples gives the same mask
+        thresh = 10 ** (silence_thresh / 20) * 2 ** (8 * sample_width - 1) / gain
+        min_silence_frames = -(-min_silence_len // frame_ms)
+
+        def nonsilent_frame_ranges():
+            position = 0  # frames analyzed so far
+            range_start = None  # start of the non-silent range being read
+            silence_start = None  # start of the trailing silent run
+            while True:
+                samples = np.frombuffer(wav_file.readframes(window_len),
+                                        dtype=SAMPLE_DTYPES[sample_width])
+                if channels > 1:
+                    samples = samples.reshape(-1, channels).mean(axis=1)
+                silent = silence_mask(samples, frame_len, thresh)
+                if len(silent) == 0:
+                    break
+
+                # Runs of equal silent/non-silent frames
+                edges = np.flatnonzero(np.diff(silent.view(np.int8))) + 1
+                run_starts = np.concatenate(([0], edges))
+                run_ends = np.concatenate((edges, [len(silent)]))
+                for start, end, is_silent in zip((run_starts + position).tolist(),
+                                                 (run_ends + position).tolist(),
+                                                 silent[run_starts].tolist()):
+                    if is_silent:
+                        if silence_start is None:
+                            silence_start = start
+                        if (range_start is not None
+                                and end - silence_start >= min_silence_frames):
+                            yield range_start, silence_start
+                            range_start = None
+                    else:
+                        if range_start is None:
+                            # Silence shorter than min_silence_len only precedes a
+                            # range at the very start, it belongs to the range
+                            short_silence = (silence_start is not None and
+                                             start - silence_start < min_silence_frames)
+                            range_start = silence_start if short_silence else start
+                        silence_start = None
+                position += len(silent)
+            if range_start is not None:
+                yield range_start, position
+
+        previous = None
+        for start, end in nonsilent_frame_ranges():
+            start_ms = start * frame_ms - keep_silence
+            if previous is not None:
+                previous_start_ms, previous_end_ms = previous
+                # If the kept silence of two neighbouring ranges overlaps, split the
+                # difference
+                if start_ms < previous_end_ms:
+                    previous_end_ms = start_ms = (start_ms + previous_end_ms) // 2
+                yield max(previous_start_ms, 0), min(previous_end_ms, total_ms)
+            previous = (start_ms, end * frame_ms + keep_silence)
+        if previous is not None:
+            yield max(previous[0], 0), min(previous[1], total_ms)
+
+
+def iter_audio_chunks(audio_path, min_silence_len=1000, silence_thresh=-30,
+                      max_chunk_length=45000, split=True, normalize=True):
+    """
+    Reads the non-silent parts of a WAV file as chunks of at most
+    max_chunk_length, one at a time. Only the PCM of the chunk being yielded is
+    held in memory, ranges longer than max_chunk_length are read from the file
+    part by part. With normalize the whole file is peak normalized to -1 dBFS
+    first, so the silence threshold and recognizers see the same level for quiet
+    and loud recordings.
+
+    :return: An iterator of (start_ms, chunk) tuples, chunks are AudioSegments in
+    speech-to-text format.
+    """
+    gain = normalization_gain(audio_path) if normalize else 1.0
+    with wave.open(audio_path, 'rb') as wav_file:
+        frame_rate = wav_file.getframerate()
+        total_ms = wav_file.getnframes() * 1000 // frame_rate
+
+        def read_chunk(start_ms, end_ms):
+            wav_file.setpos(start_ms * frame_rate // 1000)
+            data = wav_file.readframes((end_ms - start_ms) * frame_rate // 1000)
+            chunk = to_speech_format(AudioSegment(data=data,
+                                                  sample_width=wav_file.getsampwidth(),
+                                                  frame_rate=frame_rate,
+                                                  channels=wav_file.getnchannels()))
+            return apply_gain(chunk, gain)
+
+        def read_chunks(start_ms, end_ms):
+            # If the range is too long and doesn't have suitable silence, it is
+            # read in parts of max_chunk_length, so a long stretch of speech (or
+            # the whole file when not splitting) is never loaded at once
+            for sub_start_ms in range(start_ms, end_ms, max_chunk_length):
+                yield sub_start_ms, read_chunk(sub_start_ms,
+                                               min(sub_start_ms + max_chunk_length,
+                                                   end_ms))
+
+        found = False
+        if split:
+            for start_ms, end_ms in iter_nonsilent_ranges(audio_path, min_silence_len,
+                                                          silence_thresh,
+                                                          keep_silence=1000,
+                                                          gain=gain):
+                found = True
+                yield from read_chunks(start_ms, end_ms)
+        if not found:
+            yield from read_chunks(0, total_ms)
+
+
+# Longest chunk in milliseconds each vendor takes in a single request, leaving room
+# for the overlap padding. google-cloud sync recognition and naver CSR accept up to
+# 60 seconds, whisper decodes 30 second windows.
+VENDOR_MAX_CHUNK_LENGTH = {
+    "google": 45000,
+    "google-cloud": 55000,
+    "naver": 55000,
+    "whisper": 29000,
+}
 
 
 def split_audio_by_silence(audio_path, min_silence_len=1000, silence_thresh=-30,
-                           max_chunk_length=45000, overlap_ms=500):
+                           max_chunk_length=45000, overlap_ms=500, split=True,
+                           normalize=True):
     """
     Splits the audio file into chunks at silent sections, ensuring each chunk is less
-    than 60 seconds. If no suitable silence is detected within a chunk, it will be
-    split at the maximum length without silence detection.
+    than max_chunk_length. If no suitable silence is detected within a chunk, it will be
+    split at the maximum length without silence detection. Audio that already fits
+    in one chunk is returned as is. Chunks are produced lazily, so the caller can
+    start recognizing the first chunks while the rest of the file is still being
+    split.
 
     :param overlap_ms:
     :param audio_path: Path to the audio file to split.
@@ -78,51 +450,420 @@ def split_audio_by_silence(audio_path, min_silence_len=1000, silence_thresh=-30,
     silence is detected.
     :param max_chunk_length: Maximum length of each chunk in
     milliseconds.
-    :return: A list of AudioSegment chunks.
-    """
-    sound_file = AudioSegment.from_wav(audio_path)
-    initial_chunks = split_on_silence(sound_file,
-                                      min_silence_len=min_silence_len,
-                                      silence_thresh=silence_thresh,
-                                      keep_silence=1000)
-    if not initial_chunks:
-        initial_chunks = [sound_file]
-    final_chunks = []
-    for chunk in initial_chunks:
-        if len(chunk) <= max_chunk_length:
-            final_chunks.append(chunk)
+    :param split: Split at silent sections, otherwise the audio is only cut at
+    max_chunk_length.
+    :param normalize: Peak normalize the audio to -1 dBFS.
+    :return: An iterator of (start_ms, end_ms, chunk) tuples, where start_ms and
+    end_ms are the position of the chunk in the audio, not counting its padding.
+    """
+    with wave.open(audio_path, 'rb') as wav_file:
+        length_ms = wav_file.getnframes() * 1000 // wav_file.getframerate()
+    if length_ms <= max_chunk_length:
+        # A single request is cheaper than splitting and sending several
+        gain = normalization_gain(audio_path) if normalize else 1.0
+        chunk = apply_gain(to_speech_format(AudioSegment.from_wav(audio_path)), gain)
+        yield 0, len(chunk), chunk
+        return
+
+    timed_chunks, chunks = itertools.tee(
+        iter_audio_chunks(audio_path, min_silence_len, silence_thresh,
+                          max_chunk_length, split, normalize))
+    padded_chunks = add_padding_to_chunks((chunk for _, chunk in chunks), overlap_ms)
+    for (start_ms, chunk), padded_chunk in zip(timed_chunks, padded_chunks):
+        yield start_ms, start_ms + len(chunk), padded_chunk
+
+
+def chunk_to_wav_buffer(chunk):
+    """
+    Wraps the raw PCM of an AudioSegment in an in-memory WAV file, so it can be
+    handed to recognizers without exporting it to disk through ffmpeg.
+
+    :param chunk: AudioSegment to wrap.
+    :return: io.BytesIO positioned at the start of the WAV data.
+    """
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as wav_file:
+        wav_file.setnchannels(chunk.channels)
+        wav_file.setsampwidth(chunk.sample_width)
+        wav_file.setframerate(chunk.frame_rate)
+        wav_file.writeframes(chunk.raw_data)
+    buf.seek(0)
+    return buf
+
+
+def io_uring_supported():
+    if liburing is None or platform.system() != 'Linux':
+        return False
+    try:
+        major, minor = (int(part) for part in platform.release().split('.')[:2])
+    except ValueError:
+        return False
+    return (major, minor) >= (5, 10)
+
+
+def write_files_io_uring(fds, contents):
+    """
+    Writes each content to its file descriptor, submitting all writes to io_uring
+    as a single batch.
+    """
+    ring = liburing.Ring()
+    cqe = liburing.Cqe()
+    liburing.io_uring_queue_init(max(1, len(fds)), ring)
+    try:
+        for i, (fd, data) in enumerate(zip(fds, contents)):
+            sqe = liburing.io_uring_get_sqe(ring)
+            liburing.io_uring_prep_write(sqe, fd, data, 0)
+            liburing.io_uring_sqe_set_data64(sqe, i)
+        liburing.io_uring_submit(ring)
+
+        for _ in range(len(fds)):
+            liburing.io_uring_wait_cqe(ring, cqe)
+            i, written = cqe[0].user_data, cqe[0].res
+            liburing.io_uring_cq_advance(ring, 1)
+            if written < 0:
+                raise OSError(-written, os.strerror(-written))
+            # Finish a short write synchronously
+            view = memoryview(contents[i])
+            while written < len(view):
+                written += os.pwrite(fds[i], view[written:], written)
+    finally:
+        liburing.io_uring_queue_exit(ring)
+
+
+# Lists the chunk files dumped with --dump-chunks and their position in the audio
+CHUNK_INDEX_FILE = "chunks.tsv"
+
+
+def write_chunk_files(audio_chunks, directory=".", first_index=0):
+    """
+    Writes every chunk to 'chunkX.wav' in `directory`. The WAV files are built in
+    memory and, when there is more than one, written in one io_uring batch on
+    Linux >= 5.10 when liburing is installed, otherwise one after another.
+
+    :param audio_chunks: List of AudioSegment chunks to write.
+    :param directory: Directory to write the chunk files to.
+    :param first_index: Number of the first chunk file.
+    """
+    contents = [chunk_to_wav_buffer(chunk).getvalue() for chunk in audio_chunks]
+    fds = [os.open(os.path.join(directory, f"chunk{first_index + i}.wav"),
+                   os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+           for i in range(len(contents))]
+    try:
+        if len(fds) > 1 and io_uring_supported():
+            # Setting up a ring only pays off for a batch
+            write_files_io_uring(fds, contents)
         else:
-            # If the chunk is too long and doesn't have suitable silence, split it into
-            # smaller parts
-            num_subchunks = len(chunk) // max_chunk_length + 1
-            for i in range(num_subchunks):
-                start_ms = i * max_chunk_length
-                end_ms = min((i + 1) * max_chunk_length, len(chunk))
-                sub_chunk = chunk[start_ms:end_ms]
-                final_chunks.append(sub_chunk)
+            for fd, data in zip(fds, contents):
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+    finally:
+        for fd in fds:
+            os.close(fd)
 
-    return add_padding_to_chunks(final_chunks, overlap_ms)
 
+def write_chunk_index(timings, directory="."):
+    """
+    Writes where every dumped chunk is in the audio, so find_existing_chunks can
+    give reused chunk files their real subtitle timings.
 
-def recognize_audio_chunks(audio_chunks, vendor, language="ko-KR"):
+    :param timings: List of (start_ms, end_ms) tuples, one per chunk file.
+    :param directory: Directory the chunk files were written to.
     """
-    Recognizes speech from audio chunks using Google Cloud Speech-to-Text.
+    path = os.path.join(directory, CHUNK_INDEX_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as index_file:
+        for i, (start_ms, end_ms) in enumerate(timings):
+            index_file.write(f"chunk{i}.wav\t{start_ms}\t{end_ms}\n")
+    os.replace(tmp_path, path)
 
-    :param audio_chunks: List of AudioSegment chunks to process.
+
+def remove_chunk_index(directory="."):
+    try:
+        os.remove(os.path.join(directory, CHUNK_INDEX_FILE))
+    except FileNotFoundError:
+        pass
+
+
+def transcript_cache_key(chunk, vendor, language):
+    """
+    Content hash of a chunk's audio together with the vendor and language it is
+    recognized with.
     """
-    recognizer = sr.Recognizer()
+    hasher = xxhash.xxh3_64() if xxhash is not None else hashlib.blake2b(digest_size=16)
+    hasher.update(chunk.raw_data)
+    hasher.update(f"{chunk.frame_rate}:{chunk.channels}:{chunk.sample_width}:"
+                  f"{vendor}:{language}".encode())
+    return hasher.hexdigest()
 
-    for i, chunk in enumerate(audio_chunks):
-        # Export chunk to a temporary WAV file
-        chunk_file_path = f"chunk{i}.wav"
-        chunk.export(chunk_file_path, format="wav")
 
-        # Recognize the chunk
-        recognize_audio(recognizer, f"{i}: ", chunk_file_path, vendor, language)
+def load_cached_transcript(key):
+    try:
+        with open(os.path.join(TRANSCRIPT_CACHE_DIR, f"{key}.txt"),
+                  encoding='utf-8') as cache_file:
+            return cache_file.read()
+    except FileNotFoundError:
+        return None
 
 
-def transcribe_audio_naver(audio_path, client_id = os.environ.get('NAVER_CLIENT_ID'),
-                           client_secret = os.environ.get('NAVER_CLIENT_SECRET')):
+def store_cached_transcript(key, text):
+    os.makedirs(TRANSCRIPT_CACHE_DIR, exist_ok=True)
+    path = os.path.join(TRANSCRIPT_CACHE_DIR, f"{key}.txt")
+    # Write to a temporary file first so an interrupted run never leaves a
+    # truncated transcript behind
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+        cache_file.write(text)
+    os.replace(tmp_path, path)
+
+
+def format_srt_timestamp(ms):
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{ms:03d}"
+
+
+async def split_producer(timed_chunks, chunk_queue, n_consumers, executor,
+                         dump_chunks=False, dump_batch_size=16):
+    """
+    Puts (index, start_ms, end_ms, chunk) on the queue as chunks are split off the
+    audio, followed by one None per consumer. With dump_chunks the chunks are
+    written to 'chunkX.wav' in batches of `dump_batch_size`.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = enumerate(timed_chunks)
+    dumped = []
+    timings = []
+    if dump_chunks:
+        # The index is only written once every chunk is on disk, a stale one
+        # would pair new chunk files with old timings
+        remove_chunk_index()
+
+    def next_chunk():
+        item = next(iterator, None)
+        if dump_chunks:
+            if item is not None:
+                dumped.append(item)
+                timings.append(item[1][:2])
+            if dumped and (item is None or len(dumped) >= dump_batch_size):
+                # Chunk indexes are consecutive, so the batch is written together
+                # and io_uring submits it at once
+                write_chunk_files([chunk for _, (_, _, chunk) in dumped],
+                                  first_index=dumped[0][0])
+                dumped.clear()
+            if item is None:
+                write_chunk_index(timings)
+        return item
+
+    while True:
+        # Splitting reads and decodes audio, so it runs off the event loop and
+        # earlier chunks are recognized meanwhile
+        item = await loop.run_in_executor(executor, next_chunk)
+        if item is None:
+            break
+        index, (start_ms, end_ms, chunk) = item
+        await chunk_queue.put((index, start_ms, end_ms, chunk))
+    for _ in range(n_consumers):
+        await chunk_queue.put(None)
+
+
+async def stt_consumer(chunk_queue, result_queue, recognize):
+    """
+    Recognizes chunks one at a time until it takes None off the queue.
+    """
+    while True:
+        item = await chunk_queue.get()
+        if item is None:
+            break
+        index, start_ms, end_ms, chunk = item
+        text = await recognize(index, chunk)
+        await result_queue.put((index, start_ms, end_ms, text))
+
+
+async def whisper_consumer(chunk_queue, result_queue, recognize_batch, batch_size):
+    """
+    Recognizes the chunks waiting on the queue in batches of up to `batch_size`
+    until it takes None off the queue.
+    """
+    finished = False
+    while not finished:
+        items = []
+        item = await chunk_queue.get()
+        while item is not None:
+            items.append(item)
+            if len(items) >= batch_size or chunk_queue.empty():
+                break
+            item = chunk_queue.get_nowait()
+        finished = item is None
+        if items:
+            texts = await recognize_batch([chunk for _, _, _, chunk in items])
+            for (index, start_ms, end_ms, _), text in zip(items, texts):
+                await result_queue.put((index, start_ms, end_ms, text))
+
+
+async def srt_writer(result_queue, srt_file):
+    """
+    Writes results to the SRT file in chunk order as soon as all earlier chunks
+    are done, results that arrive early wait in a min-heap keyed by chunk index.
+    """
+    pending = []
+    next_index = 0
+    number = 1
+    while True:
+        result = await result_queue.get()
+        if result is None:
+            break
+        heapq.heappush(pending, result)
+        while pending and pending[0][0] == next_index:
+            index, start_ms, end_ms, text = heapq.heappop(pending)
+            next_index += 1
+            if text is None:
+                continue
+            print(f"{index}: {text}")
+            if text.strip():
+                srt_file.write(f"{number}\n{format_srt_timestamp(start_ms)} --> "
+                               f"{format_srt_timestamp(end_ms)}\n{text.strip()}\n\n")
+                srt_file.flush()
+                number += 1
+
+
+async def recognize_audio_pipeline(timed_chunks, vendor, srt_path, language="ko-KR",
+                                   concurrency=8, dump_chunks=False,
+                                   whisper_batch_size=16, cache=True,
+                                   adjust_noise=False):
+    """
+    Runs the split, recognize and write stages of recognize_audio_chunks as
+    asyncio tasks connected by queues. Splitting and the blocking recognizers run
+    on a pool of `concurrency` + 1 threads, so the splitter always has a thread
+    of its own next to the recognition requests.
+    """
+    loop = asyncio.get_running_loop()
+    chunk_queue = asyncio.Queue(maxsize=2 * max(concurrency, whisper_batch_size))
+    result_queue = asyncio.Queue()
+    # Cache key -> recognized text (future), identical chunks are only recognized once
+    texts = {}
+
+    def recognize_chunk(index, chunk):
+        # Runs in a worker thread, which has its own recognizer
+        return recognize_audio(get_thread_recognizer(), f"{index}: ",
+                               chunk_to_wav_buffer(chunk), vendor, language,
+                               adjust_noise)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency) + 1) as executor:
+        async with contextlib.AsyncExitStack() as stack:
+            # Only naver uploads go through httpx, other vendors don't need the
+            # HTTP/2 extra installed
+            naver_client = None
+            if vendor == "naver":
+                naver_client = await stack.enter_async_context(
+                    httpx.AsyncClient(http2=True, timeout=30))
+
+            async def recognize_uncached(index, chunk, key):
+                text = load_cached_transcript(key) if cache else None
+                if text is None:
+                    if vendor == "naver":
+                        text = await transcribe_audio_naver(
+                            naver_client, chunk_to_wav_buffer(chunk).getvalue())
+                    else:
+                        text = await loop.run_in_executor(executor, recognize_chunk,
+                                                          index, chunk)
+                    if cache and text is not None:
+                        store_cached_transcript(key, text)
+                return text
+
+            async def recognize(index, chunk):
+                key = transcript_cache_key(chunk, vendor, language)
+                if key not in texts:
+                    texts[key] = asyncio.ensure_future(
+                        recognize_uncached(index, chunk, key))
+                return await texts[key]
+
+            async def recognize_batch(chunks):
+                keys = [transcript_cache_key(chunk, vendor, language)
+                        for chunk in chunks]
+                pending = {}
+                for key, chunk in zip(keys, chunks):
+                    if key in texts or key in pending:
+                        continue
+                    text = load_cached_transcript(key) if cache else None
+                    if text is None:
+                        pending[key] = chunk
+                    else:
+                        texts[key] = text
+                if pending:
+                    results = await loop.run_in_executor(executor,
+                                                         transcribe_chunks_whisper,
+                                                         list(pending.values()),
+                                                         language, whisper_batch_size)
+                    for key, (_, text) in zip(pending, results):
+                        texts[key] = text
+                        if cache and text is not None:
+                            store_cached_transcript(key, text)
+                return [texts[key] for key in keys]
+
+            if vendor == "whisper":
+                consumers = [whisper_consumer(chunk_queue, result_queue,
+                                              recognize_batch,
+                                              max(1, whisper_batch_size))]
+            else:
+                consumers = [stt_consumer(chunk_queue, result_queue, recognize)
+                             for _ in range(max(1, concurrency))]
+
+            with open(srt_path, 'w', encoding='utf-8') as srt_file:
+                writer = asyncio.ensure_future(srt_writer(result_queue, srt_file))
+                await asyncio.gather(split_producer(timed_chunks, chunk_queue,
+                                                    len(consumers), executor,
+                                                    dump_chunks),
+                                     *consumers)
+                await result_queue.put(None)
+                await writer
+
+
+def recognize_audio_chunks(timed_chunks, vendor, srt_path, language="ko-KR",
+                           concurrency=8, dump_chunks=False, whisper_batch_size=16,
+                           cache=True, adjust_noise=False):
+    """
+    Recognizes speech from audio chunks with the given speech-to-text vendor and
+    writes them as subtitles to an SRT file.
+
+    Chunks are recognized as soon as they are split off the audio, so splitting
+    overlaps with recognition. Up to `concurrency` chunks are recognized at the
+    same time since each request is mostly waiting on the network, whisper chunks
+    are decoded in batches instead. Subtitles are written, and printed, in chunk
+    order as soon as all earlier chunks are done. Chunks already recognized in a
+    previous run, or identical to another chunk, are not sent again.
+
+    :param timed_chunks: Iterable of (start_ms, end_ms, chunk) tuples, as produced
+    by split_audio_by_silence.
+    :param vendor: Speech-to-text vendor name.
+    :param srt_path: Path of the SRT file to write.
+    :param language: Language code of the speech.
+    :param concurrency: Number of chunks recognized at the same time.
+    :param dump_chunks: Also export every chunk to 'chunkX.wav' for debugging and
+    for reuse on the next run.
+    :param whisper_batch_size: Number of chunks whisper decodes together.
+    :param cache: Read and store recognized text in TRANSCRIPT_CACHE_DIR.
+    :param adjust_noise: Let the recognizer estimate the noise floor of every chunk.
+    """
+    asyncio.run(recognize_audio_pipeline(timed_chunks, vendor, srt_path, language,
+                                         concurrency, dump_chunks, whisper_batch_size,
+                                         cache, adjust_noise))
+
+
+async def transcribe_audio_naver(client, audio_bytes,
+                                 client_id = os.environ.get('NAVER_CLIENT_ID'),
+                                 client_secret = os.environ.get('NAVER_CLIENT_SECRET')):
+    """
+    Transcribes speech with Naver CSR (Clova Speech Recognition).
+
+    :param client: httpx.AsyncClient shared by all uploads, so they reuse its
+    HTTP/2 connection.
+    :param audio_bytes: WAV file content.
+    :return: Transcribed text, or None if the request failed.
+    """
+    if not client_id or not client_secret:
+        raise ValueError("NAVER_CLIENT_ID and NAVER_CLIENT_SECRET must be set")
     url = "https://naveropenapi.apigw.ntruss.com/recog/v1/stt?lang=Kor"
     headers = {
         "Content-Type": "application/octet-stream",
@@ -130,8 +871,18 @@ def transcribe_audio_naver(audio_path, client_id = os.environ.get('NAVER_CLIENT_
         "X-NCP-APIGW-API-KEY": client_secret,
     }
 
-    with open(audio_path, 'rb') as audio_file:
-        response = requests.post(url, headers=headers, data=audio_file)
+    for attempt in range(NAVER_MAX_RETRIES + 1):
+        await NAVER_RATE_LIMITER.acquire_async()
+        response = await client.post(url, headers=headers, content=audio_bytes)
+        if response.status_code not in (429, 503) or attempt == NAVER_MAX_RETRIES:
+            break
+        # Throttled, back off exponentially unless the server tells us how long to wait
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is not None and retry_after.isdigit():
+            delay = int(retry_after)
+        else:
+            delay = 2 ** attempt + random.random()
+        await asyncio.sleep(delay)
 
     if response.status_code == 200:
         return response.json().get('text', '')
@@ -140,9 +891,19 @@ def transcribe_audio_naver(audio_path, client_id = os.environ.get('NAVER_CLIENT_
         return None
 
 
-def recognize_audio(recognizer, prefix, audio_file, vendor, language="ko-KR"):
+def recognize_audio(recognizer, prefix, audio_file, vendor, language="ko-KR",
+                    adjust_noise=False):
+    if vendor == "naver":
+        # Naver uploads share an async HTTP/2 client, see transcribe_audio_naver
+        raise ValueError("naver is recognized with transcribe_audio_naver")
+    if vendor == "whisper":
+        # Whisper decodes chunks in batches, see transcribe_chunks_whisper
+        raise ValueError("whisper is recognized with transcribe_chunks_whisper")
     with sr.AudioFile(audio_file) as source:
-        recognizer.adjust_for_ambient_noise(source)  # This line helps with noise
+        if adjust_noise:
+            # Estimates the noise floor from (and skips) the first second. Not
+            # needed for audio normalized by split_audio_by_silence
+            recognizer.adjust_for_ambient_noise(source)
         audio_data = recognizer.record(source)
         # Attempt to recognize the speech in the audio
         try:
@@ -154,36 +915,144 @@ def recognize_audio(recognizer, prefix, audio_file, vendor, language="ko-KR"):
                 # google_cloud_credentials, 'r').read()) If you've set the
                 # GOOGLE_APPLICATION_CREDENTIALS environment variable, you can omit the
                 # credentials_json argument
+                GOOGLE_RATE_LIMITER.acquire()
                 text = recognizer.recognize_google_cloud(audio_data, language=language)
-            elif vendor == "naver":
-                text = transcribe_audio_naver(audio_file)
-            elif vendor == "whisper":
-                text = recognizer.recognize_whisper(audio_data, language=language,
-                                                    model='large')
             else:
+                GOOGLE_RATE_LIMITER.acquire()
                 text = recognizer.recognize_google(audio_data, language=language)
-            print(f"{prefix}{text}")
+            return text
         except sr.UnknownValueError as e:
             print(f"{prefix} {vendor} Recognition could not understand audio; {e}")
         except sr.RequestError as e:
             print(f"{prefix} Could not request results from {vendor} Recognition service; {e}")
+        return None
 
 
 def find_existing_chunks(audio_path):
     """
-    Finds and loads existing audio chunks based on the naming convention 'chunkX.wav'.
-    
+    Loads the chunk files dumped by a previous run with --dump-chunks, together
+    with their position in the audio from CHUNK_INDEX_FILE.
+
     :param audio_path: Path where the chunks are expected to be.
-    :return: A list of AudioSegment objects if chunk files are found, else an empty list.
+    :return: A list of (start_ms, end_ms, chunk) tuples if a complete set of chunk
+    files is found, else an empty list.
     """
     directory = os.path.dirname(audio_path)
-    chunk_files = glob.glob(os.path.join(directory, 'chunk*.wav'))
-    chunk_files_sorted = sorted(chunk_files, key=lambda x: int(
-        os.path.splitext(os.path.basename(x))[0].replace('chunk', '')))
+    try:
+        with open(os.path.join(directory, CHUNK_INDEX_FILE),
+                  encoding='utf-8') as index_file:
+            entries = [line.rstrip('\n').split('\t') for line in index_file]
+    except FileNotFoundError:
+        # Without the index there are no timings to write subtitles with
+        return []
+    chunk_files = [os.path.join(directory, name) for name, _, _ in entries]
+    if not all(os.path.exists(chunk_file) for chunk_file in chunk_files):
+        return []
+
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        audio_chunks = list(executor.map(AudioSegment.from_wav, chunk_files))
+    return [(int(start_ms), int(end_ms), chunk)
+            for (_, start_ms, end_ms), chunk in zip(entries, audio_chunks)]
+
+
+def get_spleeter_separator():
+    global _spleeter_separator
+    if _spleeter_separator is None:
+        # Imported lazily, tensorflow takes seconds to import
+        from spleeter.separator import Separator
+        # Use spleeter's '2stems' model to separate vocals and accompaniment
+        _spleeter_separator = Separator('spleeter:2stems')
+    return _spleeter_separator
+
+
+def get_demucs_model():
+    global _demucs_model
+    if _demucs_model is None:
+        from demucs.pretrained import get_model
+        _demucs_model = get_model('htdemucs')
+        _demucs_model.eval()
+    return _demucs_model
+
+
+def get_whisper_model():
+    global _whisper_model
+    if _whisper_model is None:
+        import whisper
+        _whisper_model = whisper.load_model('large')
+    return _whisper_model
+
+
+def whisper_language(language):
+    # whisper takes bare language codes, 'ko-KR' -> 'ko'
+    return language.split('-')[0].lower()
+
+
+def whisper_samples(chunk):
+    """
+    Converts an AudioSegment into the 16kHz mono float32 samples whisper expects.
+    """
+    chunk = chunk.set_frame_rate(16000).set_channels(1).set_sample_width(2)
+    return audio_segment_samples(chunk).astype(np.float32) / 32768.0
+
+
+def transcribe_audio_whisper(audio, language="ko-KR"):
+    """
+    Transcribes speech with a whisper model that is loaded once and shared by all
+    chunks.
+
+    :param audio: 16kHz mono float32 samples.
+    :param language: Language code of the speech, e.g. 'ko-KR' or 'ko'.
+    :return: Transcribed text.
+    """
+    import torch
+
+    with _whisper_lock:
+        result = get_whisper_model().transcribe(audio,
+                                                language=whisper_language(language),
+                                                fp16=torch.cuda.is_available())
+    return result['text']
+
+
+def transcribe_chunks_whisper(audio_chunks, language="ko-KR", batch_size=16):
+    """
+    Transcribes chunks with whisper, decoding up to `batch_size` chunks in a single
+    forward pass. Chunks are sorted by duration before batching so that chunks in a
+    batch decode to similar lengths. Chunks longer than whisper's 30 second window
+    are transcribed one by one.
+
+    :param audio_chunks: List of AudioSegment chunks to process.
+    :param language: Language code of the speech.
+    :param batch_size: Number of chunks decoded together.
+    :return: A list of (index, text) tuples in chunk order.
+    """
+    import torch
+    import whisper
+
+    samples = [whisper_samples(chunk) for chunk in audio_chunks]
+    texts = [None] * len(samples)
+    short = sorted((i for i, audio in enumerate(samples)
+                    if len(audio) <= whisper.audio.N_SAMPLES),
+                   key=lambda i: len(samples[i]))
+    options = whisper.DecodingOptions(language=whisper_language(language),
+                                      without_timestamps=True,
+                                      fp16=torch.cuda.is_available())
+
+    with _whisper_lock:
+        model = get_whisper_model()
+        for start in range(0, len(short), max(1, batch_size)):
+            batch = short[start:start + max(1, batch_size)]
+            mel = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(samples[i]),
+                                            n_mels=model.dims.n_mels)
+                for i in batch]).to(model.device)
+            for i, result in zip(batch, model.decode(mel, options)):
+                texts[i] = result.text
+
+    for i, audio in enumerate(samples):
+        if texts[i] is None:
+            texts[i] = transcribe_audio_whisper(audio, language)
+    return list(enumerate(texts))
 
-    audio_chunks = [AudioSegment.from_wav(chunk_file) for chunk_file in
-                    chunk_files_sorted]
-    return audio_chunks
 
 def separate_vocals(audio_path, output_path):
     """
@@ -192,31 +1061,124 @@ def separate_vocals(audio_path, output_path):
     :param audio_path: Path to the input audio file.
     :param output_path: Directory where the separated audio files will be saved.
     """
-    # Use spleeter's '2stems' model to separate vocals and accompaniment
-    separator = Separator('spleeter:2stems')
-
     # The vocals will be saved as 'output_path/filename/vocals.wav'
     base_filename = os.path.splitext(os.path.basename(audio_path))[0]
     vocals_path = os.path.join(output_path, base_filename, 'vocals.wav')
     if not os.path.exists(vocals_path):
         # Perform separation
-        separator.separate_to_file(audio_path, output_path)
+        get_spleeter_separator().separate_to_file(audio_path, output_path)
+    return vocals_path
+
+
+def separate_vocals_demucs(audio_path, output_path):
+    """
+    Separates vocals from the background in an audio file using demucs, on cuda or
+    mps when available.
+
+    :param audio_path: Path to the input audio file.
+    :param output_path: Directory where the separated audio files will be saved.
+    """
+    # The vocals will be saved as 'output_path/demucs/filename/vocals.wav'
+    base_filename = os.path.splitext(os.path.basename(audio_path))[0]
+    vocals_path = os.path.join(output_path, 'demucs', base_filename, 'vocals.wav')
+    if os.path.exists(vocals_path):
+        return vocals_path
+
+    import torch
+    from demucs.apply import apply_model
+    from demucs.audio import AudioFile, save_audio
+
+    if torch.cuda.is_available():
+        device = 'cuda'
+    elif torch.backends.mps.is_available():
+        device = 'mps'
+    else:
+        device = 'cpu'
+
+    model = get_demucs_model()
+    wav = AudioFile(audio_path).read(streams=0, samplerate=model.samplerate,
+                                     channels=model.audio_channels)
+    ref = wav.mean(0)
+    wav = (wav - ref.mean()) / ref.std()
+    with torch.no_grad():
+        sources = apply_model(model, wav[None], device=device, progress=False)[0]
+    sources = sources * ref.std() + ref.mean()
+
+    os.makedirs(os.path.dirname(vocals_path), exist_ok=True)
+    save_audio(sources[model.sources.index('vocals')].cpu(), vocals_path,
+               model.samplerate)
     return vocals_path
 
 
+def separate_audio(audio_path, method, output_path="audio_output"):
+    """
+    Runs the selected vocal separation, 'none' returns the audio as is.
+
+    :return: Path to the audio to split into chunks.
+    """
+    if method == "spleeter":
+        return separate_vocals(audio_path, output_path)
+    elif method == "demucs":
+        return separate_vocals_demucs(audio_path, output_path)
+    return audio_path
+
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print(f"Usage: {__file__} <video_file_path> <speech-to-text vendor> <language>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Generate subtitles from a video file using speech to text api.")
+    parser.add_argument("video_path", help="video file path")
+    parser.add_argument("vendor", nargs="?", default="google",
+                        help="speech-to-text vendor (google, google-cloud, naver, whisper)")
+    parser.add_argument("language", nargs="?", default="ko-KR",
+                        help="language code of the speech")
+    parser.add_argument("--srt", help="subtitle file to write (default: video file "
+                                      "path with .srt extension)")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="number of chunks recognized at the same time")
+    parser.add_argument("--dump-chunks", action="store_true",
+                        help="export audio chunks to chunkX.wav files")
+    parser.add_argument("--whisper-batch-size", type=int, default=16,
+                        help="number of chunks whisper decodes together")
+    parser.add_argument("--no-split", action="store_true",
+                        help="don't split audio at silence, only at the vendor's "
+                             "maximum request length")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="don't read or store recognized text in "
+                             "~/.cache/autogen-subtitles")
+    parser.add_argument("--adjust-noise", action="store_true",
+                        help="estimate the noise floor of every chunk before "
+                             "recognizing it")
+    parser.add_argument("--separate", choices=["spleeter", "demucs", "none"],
+                        default="none",
+                        help="separate vocals from the background before splitting")
+    args = parser.parse_args()
+    if args.vendor == "naver" and not (os.environ.get('NAVER_CLIENT_ID')
+                                       and os.environ.get('NAVER_CLIENT_SECRET')):
+        parser.error("naver requires NAVER_CLIENT_ID and NAVER_CLIENT_SECRET")
 
-    video_path = sys.argv[1]  # Get video file path from script argument
+    video_path = args.video_path
     audio_path = "temp_audio.wav"
-    vendor = 'google' if len(sys.argv) < 3 else sys.argv[2]
-    language = 'ko-KR' if len(sys.argv) < 4 else sys.argv[3]
+    vendor = args.vendor
+    language = args.language
+    srt_path = args.srt or os.path.splitext(video_path)[0] + ".srt"
+    max_chunk_length = VENDOR_MAX_CHUNK_LENGTH.get(vendor, 45000)
     if not os.path.exists(audio_path):
         audio_path = convert_video_to_audio(video_path, audio_path)
-        audio_path = separate_vocals(audio_path, "audio_output")
-        audio_chunks = split_audio_by_silence(audio_path)
+        audio_path = separate_audio(audio_path, args.separate)
+        timed_chunks = split_audio_by_silence(audio_path,
+                                              max_chunk_length=max_chunk_length,
+                                              split=not args.no_split)
     else:
-        audio_chunks = find_existing_chunks(audio_path)
-    recognize_audio_chunks(audio_chunks, vendor, language)
+        timed_chunks = find_existing_chunks(audio_path)
+        if not timed_chunks:
+            # Chunks are only kept on disk with --dump-chunks
+            audio_path = separate_audio(audio_path, args.separate)
+            timed_chunks = split_audio_by_silence(audio_path,
+                                                  max_chunk_length=max_chunk_length,
+                                                  split=not args.no_split)
+    recognize_audio_chunks(timed_chunks, vendor, srt_path, language,
+                           concurrency=args.concurrency,
+                           dump_chunks=args.dump_chunks,
+                           whisper_batch_size=args.whisper_batch_size,
+                           cache=not args.no_cache,
+                           adjust_noise=args.adjust_noise)